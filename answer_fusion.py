@@ -0,0 +1,162 @@
+import json
+import logging
+import math
+import re
+
+logger = logging.getLogger(__name__)
+
+# Marks prompts that expect a JSON partial answer back; pass it to offline backends
+# (model_backend.StubBackend) so they know to reply in that shape
+PARTIAL_ANSWER_MARKER = "Reply with a single JSON object and nothing else"
+
+PARTIAL_ANSWER_PROMPT = (
+    "Context from {name} (pages {pages}):\n{context}\n\n"
+    "Using only the above context, answer the following question in at most three sentences:\n\n"
+    "{question}\n\n"
+    f"{PARTIAL_ANSWER_MARKER}, in the form "
+    '{{"relevance": <number from 0 to 1>, "answer": "<answer>"}}. '
+    "relevance is how well the context answers the question; use 0 and an empty answer "
+    "if the context does not cover it."
+)
+
+FUSION_PROMPT = (
+    "The following partial answers to a question were taken from different parts of {name}. "
+    "Each is labelled with the pages it came from.\n\n"
+    "{partials}\n\n"
+    "Question: {question}\n\n"
+    "Write one concise, combined answer to the question using only these partial answers. "
+    "Remove repetition, and cite the pages you rely on in the form (p. 12) or (pp. 12-13)."
+)
+
+NO_ANSWER = "The textbook does not appear to cover this question."
+# Used when only the chunks related to the question (or the first max_chunks) were asked
+NO_ANSWER_IN_SEARCHED = "The parts of the textbook that were searched do not appear to answer this question."
+
+_WORD = re.compile(r"\w{3,}")
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+_STOPWORDS = frozenset(
+    "the and for are was were what which who whom whose why how when where this that "
+    "these those with from into about does did has have had can could should would "
+    "will shall not but you your its their there them they give list explain describe".split()
+)
+
+
+# A chunk's contribution to an answer, scored by the model for relevance
+class PartialAnswer:
+    __slots__ = ("chunk", "relevance", "answer")
+
+    def __init__(self, chunk, relevance, answer):
+        self.chunk = chunk
+        self.relevance = relevance
+        self.answer = answer
+
+    @property
+    def citation(self):
+        prefix = "p." if self.chunk.first_page == self.chunk.last_page else "pp."
+        return f"{prefix} {_pages(self.chunk)}"
+
+
+def _pages(chunk):
+    if chunk.first_page == chunk.last_page:
+        return str(chunk.first_page)
+    return f"{chunk.first_page}-{chunk.last_page}"
+
+
+# Crude suffix stripping so "giving", "gives" and "give" count as the same term
+def _stem(word):
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if word.endswith(suffix) and not word.endswith("ss") and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def _terms(text):
+    return {_stem(word) for word in _WORD.findall(text.lower()) if word not in _STOPWORDS}
+
+
+# Function to order chunks by how many of the question's terms they contain, so the
+# chunks most likely to answer it are asked first and early termination kicks in sooner.
+# Chunks sharing no term with the question are left out when any chunk shares one;
+# otherwise every chunk is returned in book order.
+def rank_chunks(question, document):
+    terms = _terms(question)
+    if not terms:
+        return list(document.chunks)
+    scores = [len(terms & _terms(document.chunk_text(chunk))) for chunk in document.chunks]
+    if not any(scores):
+        return list(document.chunks)
+    order = sorted((i for i in range(len(document.chunks)) if scores[i]), key=lambda i: -scores[i])
+    return [document.chunks[i] for i in order]
+
+
+# Function to read the model's JSON reply; anything unparseable counts as irrelevant
+def parse_partial_answer(response_text):
+    match = _JSON_OBJECT.search(response_text or "")
+    if not match:
+        return 0.0, ""
+    try:
+        data = json.loads(match.group(0))
+        relevance = float(data.get("relevance", 0))
+        answer = str(data.get("answer") or "").strip()
+    except (ValueError, TypeError, AttributeError):
+        return 0.0, ""
+    if not math.isfinite(relevance):
+        return 0.0, ""
+    return min(max(relevance, 0.0), 1.0), answer
+
+
+# Function to answer a question from a Document: each chunk gives a scored partial
+# answer, weak ones are dropped, the loop stops once enough confident evidence is
+# in, and the survivors are fused into one answer with page citations.
+# max_chunks optionally caps how many chunks are asked; by default the loop only
+# stops on enough confident evidence or when the ranked chunks run out.
+# `name` is the book's file name as this session uploaded it, and `generate` sends
+# a single prompt to the model and returns the reply text.
+def answer_question(
+    question,
+    document,
+    name,
+    generate,
+    min_relevance=0.5,
+    confident_relevance=0.8,
+    enough_evidence=3,
+    max_chunks=None,
+    max_partials=5,
+):
+    partials = []
+    confident = 0
+    chunks = rank_chunks(question, document)
+    if max_chunks is not None:
+        chunks = chunks[:max_chunks]
+    for asked, chunk in enumerate(chunks):
+        prompt = PARTIAL_ANSWER_PROMPT.format(
+            name=name,
+            pages=_pages(chunk),
+            context=document.chunk_text(chunk),
+            question=question,
+        )
+        relevance, answer = parse_partial_answer(generate(prompt))
+        logger.info(f"Chunk {chunk} scored relevance {relevance:.2f}")
+        if relevance < min_relevance or not answer:
+            continue
+        partials.append(PartialAnswer(chunk, relevance, answer))
+        if relevance >= confident_relevance:
+            confident += 1
+            if confident >= enough_evidence:
+                logger.info(f"Stopping after {asked + 1} chunks with {confident} confident answers")
+                break
+
+    if not partials:
+        return NO_ANSWER if len(chunks) == len(document.chunks) else NO_ANSWER_IN_SEARCHED
+
+    partials.sort(key=lambda partial: -partial.relevance)
+    partials = partials[:max_partials]
+    if len(partials) == 1:
+        return f"{partials[0].answer} ({partials[0].citation})"
+
+    fusion_prompt = FUSION_PROMPT.format(
+        name=name,
+        partials="\n".join(f"[{partial.citation}] {partial.answer}" for partial in partials),
+        question=question,
+    )
+    return generate(fusion_prompt).strip()
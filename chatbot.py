@@ -1,57 +1,56 @@
-import os
 import io
 import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image
 import streamlit as st
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import google.generativeai as genai
+from document import Document
+from document_store import get_document_store
+from model_backend import get_model_backend
+from prompts import build_ncert_comparison_prompt
 from dotenv import load_dotenv
 import pdfplumber
 import logging
-from fpdf import FPDF
+from report_export import EXPORT_FORMATS, export_report
 import time  # For simulating processing time
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API key
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Books extracted by any session are shared through the process-wide store
+document_store = get_document_store()
 
-# Initialize Gemini Pro model
-model = genai.GenerativeModel("gemini-pro")
-chat = model.start_chat(history=[])
+# Initialize the model backend (Gemini Pro unless LLM_BACKEND selects the stub or a recording)
+model = get_model_backend()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Function to extract text from a PDF using PyMuPDF and pdfplumber with OCR for images
-def extract_text_from_pdf(file):
-    text = ""
+# Function to extract per-page text from a PDF using PyMuPDF and pdfplumber with OCR for images
+def extract_pages_from_pdf(file):
+    pages = []
     try:
         with pdfplumber.open(file) as pdf:
             for page in pdf.pages:
                 page_text = page.extract_text()
-                if page_text:
-                    text += page_text
                 
                 if not page_text.strip():
                     page_image = page.to_image()
                     ocr_text = pytesseract.image_to_string(page_image.original, config='--psm 6')
-                    text += ocr_text
+                    page_text += ocr_text
+                pages.append(page_text)
                     
     except Exception as e:
         logger.error(f"pdfplumber failed: {e}")
         logger.info("Falling back to PyMuPDF for text extraction.")
         
+        pages = []
         file.seek(0)
         pdf_document = fitz.open(stream=file.read(), filetype="pdf")
 
         for page_num in range(len(pdf_document)):
             page = pdf_document.load_page(page_num)
             page_text = page.get_text("text")
-            text += page_text
 
             if not page_text.strip():
                 image_list = page.get_images(full=True)
@@ -61,60 +60,27 @@ def extract_text_from_pdf(file):
                     image_bytes = base_image["image"]
                     image = Image.open(io.BytesIO(image_bytes))
                     ocr_text = pytesseract.image_to_string(image, config='--psm 6')
-                    text += ocr_text
+                    page_text += ocr_text
+            pages.append(page_text)
 
-    return text
+    return pages
 
-# Function to chunk text using RecursiveCharacterTextSplitter
-def chunk_text(text, chunk_size=10000, chunk_overlap=1000):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    return text_splitter.split_text(text)
+# Function to extract a PDF into a Document (one text buffer with page and chunk offsets)
+def extract_document_from_pdf(file):
+    return Document.from_pages(extract_pages_from_pdf(file))
 
 # Function to compare textbooks (PDFs) and include names
-def compare_textbooks(texts, names):
-    if len(texts) == 2:
-        textbook1_name = names[0]
-        textbook2_name = names[1]
-
-        full_prompt = (
-    f"Conduct a comparative analysis of the following two textbooks. The first textbook is '{textbook1_name}', and the second textbook is '{textbook2_name}'. This analysis is intended for educators, curriculum developers, and parents to evaluate how well '{textbook2_name}' aligns with NCERT guidelines:\n\n"
-    f"Textbook 1 ({textbook1_name}):\n{texts[0]}\n\n"
-    f"Textbook 2 ({textbook2_name}):\n{texts[1]}\n\n"
-    "Provide a detailed analysis of each chapter in '{textbook2_name}', focusing on its alignment with NCERT guidelines. For each chapter, address the following:\n\n"
-    "  {chapter_name} - Alignment with NCERT Guidelines**:\n"
-    "  1. What are the strengths of the chapter '{chapter_name}' in terms of content coverage, clarity, relevance to learning objectives, and use of age-appropriate examples?provide atleast six to ten points \n"
-    "  2. Provide constructive suggestions for improving '{chapter_name}', including additional pictures, activities, exercises, and examples that could be added to better align with NCERT guidelines.\n"
-    "  3. Give specific and age-appropriate examples that could help enhance the understanding of six-year-old children.\n"
-    "  4. Identify any unique elements in '{chapter_name}' that make it particularly effective for achieving the NCERT learning objectives.\n\n"
-    "  5. Overall, summarize the alignment of '{textbook2_name}' with NCERT guidelines, focusing on how its chapters provide a valuable learning experience while adhering to NCERT standards."
-    "  6. List all the diffcult words used in this books chapter that can be diffcult to understand by the six to seven years old children or class 1 students also give me the suggestion to replace those difficult words."
-)
-
-    
+def compare_textbooks(documents, names):
+    if len(documents) == 2:
+        full_prompt = build_ncert_comparison_prompt(documents, names)
         logger.info(f"Sending comparison prompt to Gemini: {full_prompt}")  
-        response = chat.send_message(full_prompt, stream=True)
-        response.resolve()
-        comparisons = response.text
+        comparisons = model.generate(full_prompt)
         logger.info(f"Received comparison response from Gemini: {comparisons}")  
     else:
         comparisons = "Error: Need exactly two textbooks for comparison."
     
     return comparisons
 
-# Function to save comparison result to a PDF
-def save_comparison_to_pdf(comparison_text, file_name="comparison_result.pdf"):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    
-    # Split the text into lines to fit into the PDF
-    lines = comparison_text.split('\n')
-    for line in lines:
-        pdf.multi_cell(0, 10, line)
-    
-    pdf.output(file_name)
-    logger.info(f"Comparison result saved to {file_name}")
-
 # Initialize Streamlit app with layout
 st.set_page_config(page_title="Suggestion to ATC publishers class 1 value education based on NCERT guidelines")
 
@@ -208,10 +174,12 @@ with st.sidebar:
 # Main content
 if 'chat_history' not in st.session_state:
     st.session_state['chat_history'] = []
-if 'textbook_chunks' not in st.session_state:
-    st.session_state['textbook_chunks'] = []
-if 'textbook_names' not in st.session_state:
-    st.session_state['textbook_names'] = []
+if 'textbook_handles' not in st.session_state:
+    st.session_state['textbook_handles'] = []
+if 'comparison_result' not in st.session_state:
+    st.session_state['comparison_result'] = None
+if 'comparison_exports' not in st.session_state:
+    st.session_state['comparison_exports'] = {}
 
 if uploaded_files and submit:
     with st.spinner("Processing... Please wait while we extract and process the PDFs."):
@@ -221,8 +189,7 @@ if uploaded_files and submit:
         status_text = st.empty()
 
         # Simulate time taken to process the files
-        pdf_texts = []
-        pdf_names = []
+        pdf_handles = []
 
         for uploaded_file in uploaded_files:
             for i in range(100):
@@ -233,35 +200,61 @@ if uploaded_files and submit:
             logger.info(f"Processing file: {uploaded_file.name}")
             try:
                 uploaded_file.seek(0)
-                pdf_text = extract_text_from_pdf(uploaded_file)
+                pdf_handle = document_store.attach(
+                    uploaded_file.getvalue(),
+                    uploaded_file.name,
+                    lambda: extract_document_from_pdf(uploaded_file),
+                )
                 
-                if pdf_text.strip():
-                    pdf_texts.append(pdf_text)
-                    pdf_names.append(uploaded_file.name)
+                if pdf_handle.document.text.strip():
+                    pdf_handles.append(pdf_handle)
                 else:
+                    pdf_handle.release()
                     st.write(f"Text extraction failed for {uploaded_file.name}.")
                     logger.warning(f"Text extraction failed for {uploaded_file.name}.")
             except Exception as e:
                 st.write(f"Error processing {uploaded_file.name}: {e}")
                 logger.error(f"Error processing {uploaded_file.name}: {e}")
 
-        if len(pdf_texts) == 2:
-            st.session_state['textbook_chunks'] = [chunk_text(text) for text in pdf_texts]
-            st.session_state['textbook_names'] = pdf_names
+        if len(pdf_handles) == 2:
+            for handle in st.session_state['textbook_handles']:
+                handle.release()
+            st.session_state['textbook_handles'] = pdf_handles
+            st.session_state['comparison_result'] = None
+            st.session_state['comparison_exports'] = {}
 
             st.success("Processing Complete!")
         else:
+            for handle in pdf_handles:
+                handle.release()
             st.error("Please upload exactly two textbooks for comparison.")
 
 # Once files are processed, display comparison
-if st.session_state['textbook_chunks'] and st.session_state['textbook_names']:
-    comparison_result = compare_textbooks(st.session_state['textbook_chunks'], st.session_state['textbook_names'])
-    st.markdown(f"### Textbook 1: {st.session_state['textbook_names'][0]}")
-    st.markdown(f"### Textbook 2: {st.session_state['textbook_names'][1]}")
+if st.session_state['textbook_handles']:
+    textbook_documents = [handle.document for handle in st.session_state['textbook_handles']]
+    textbook_names = [handle.name for handle in st.session_state['textbook_handles']]
+    # Generate the comparison once per upload; reruns reuse the stored result
+    if st.session_state['comparison_result'] is None:
+        st.session_state['comparison_result'] = compare_textbooks(textbook_documents, textbook_names)
+    comparison_result = st.session_state['comparison_result']
+    st.markdown(f"### Textbook 1: {textbook_names[0]}")
+    st.markdown(f"### Textbook 2: {textbook_names[1]}")
     st.markdown(comparison_result)
 
-    # Offer download of comparison as a PDF
-    save_file = st.button("Download Comparison Result as PDF")
-    if save_file:
-        save_comparison_to_pdf(comparison_result)
-        st.markdown("Download the PDF [here](comparison_result.pdf).")
+    # Offer download of the stored comparison, rendered in memory for this session only
+    # and only once the user has picked a format
+    export_format = st.selectbox("Download format", options=["Choose a format"] + list(EXPORT_FORMATS))
+    if export_format in EXPORT_FORMATS:
+        try:
+            if export_format not in st.session_state['comparison_exports']:
+                st.session_state['comparison_exports'][export_format] = export_report(comparison_result, export_format)
+            report, report_name, report_mime = st.session_state['comparison_exports'][export_format]
+            st.download_button(
+                f"Download Comparison Result as {export_format}",
+                data=report,
+                file_name=report_name,
+                mime=report_mime,
+            )
+        except Exception as e:
+            st.error(f"Could not create the {export_format} report: {e}")
+            logger.error(f"Error exporting comparison as {export_format}: {e}")
@@ -0,0 +1,80 @@
+from bisect import bisect_right
+
+from text_splitter import get_text_splitter
+
+
+# A page of a book, stored as offsets into the book's text
+class Page:
+    __slots__ = ("number", "start", "end")
+
+    def __init__(self, number, start, end):
+        self.number = number
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Page(number={self.number}, start={self.start}, end={self.end})"
+
+
+# A chunk of a book sent to the model, stored as offsets plus the pages it spans
+class Chunk:
+    __slots__ = ("start", "end", "first_page", "last_page")
+
+    def __init__(self, start, end, first_page, last_page):
+        self.start = start
+        self.end = end
+        self.first_page = first_page
+        self.last_page = last_page
+
+    def __repr__(self):
+        return (
+            f"Chunk(start={self.start}, end={self.end}, "
+            f"pages={self.first_page}-{self.last_page})"
+        )
+
+
+# One extracted book: a single backing text buffer that pages and chunks point into.
+# Documents are shared between sessions, so the uploaded file name is not kept here.
+class Document:
+    __slots__ = ("text", "pages", "chunks")
+
+    def __init__(self, text, pages, chunks):
+        self.text = text
+        self.pages = pages
+        self.chunks = chunks
+
+    # Build a document from per-page texts, joined the same way extraction always has
+    @classmethod
+    def from_pages(cls, page_texts, chunk_size=10000, chunk_overlap=1000):
+        pages = []
+        offset = 0
+        for number, page_text in enumerate(page_texts, start=1):
+            pages.append(Page(number, offset, offset + len(page_text)))
+            offset += len(page_text)
+        text = "".join(page_texts)
+
+        page_starts = [page.start for page in pages]
+        chunks = []
+        for start, end in get_text_splitter(chunk_size, chunk_overlap).split_spans(text):
+            chunks.append(Chunk(
+                start,
+                end,
+                cls._page_at(pages, page_starts, start),
+                cls._page_at(pages, page_starts, end - 1),
+            ))
+        return cls(text, pages, chunks)
+
+    @staticmethod
+    def _page_at(pages, page_starts, offset):
+        # Empty pages share their start offset with the next page, so take the last match
+        index = bisect_right(page_starts, offset) - 1
+        return pages[max(index, 0)].number if pages else 0
+
+    def page_text(self, page):
+        return self.text[page.start:page.end]
+
+    def chunk_text(self, chunk):
+        return self.text[chunk.start:chunk.end]
+
+    def __repr__(self):
+        return f"Document(pages={len(self.pages)}, chunks={len(self.chunks)})"
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+
+from document import Chunk, Document, Page
+
+logger = logging.getLogger(__name__)
+
+
+# Function to compute the key a book is stored under
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("document", "refcount")
+
+    def __init__(self, document):
+        self.document = document
+        self.refcount = 0
+
+
+# A session's reference to a shared document, with the file name this session
+# uploaded it under. The reference is released when the handle is released
+# explicitly or garbage collected along with the session state.
+class DocumentHandle:
+    def __init__(self, store, key, document, name):
+        self.key = key
+        self.document = document
+        self.name = name
+        self._finalizer = weakref.finalize(self, store.release, key)
+
+    def release(self):
+        self._finalizer()
+
+    def __repr__(self):
+        return f"DocumentHandle(key={self.key[:12]}, name={self.name!r}, document={self.document!r})"
+
+
+# Process-wide registry of extracted books keyed by content hash, so sessions
+# that open the same PDF share one Document and one extraction.
+# Documents no session is attached to are kept (most recently used first) up
+# to max_idle and then evicted. With cache_dir set, documents are also written
+# to disk so other server processes can load them instead of re-extracting; the
+# disk cache keeps at most max_disk_files books, none older than max_disk_age
+# seconds since last use.
+class DocumentStore:
+    def __init__(self, max_idle=8, cache_dir=None, max_disk_files=64, max_disk_age=30 * 24 * 3600):
+        self.max_idle = max_idle
+        self.cache_dir = cache_dir
+        self.max_disk_files = max_disk_files
+        self.max_disk_age = max_disk_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # Attach to the document for `data` under this session's file `name`, calling
+    # build() to extract it only if no session, idle entry or disk cache already has it
+    def attach(self, data, name, build):
+        key = content_hash(data)
+        document = self._acquire(key)
+        if document is not None:
+            return DocumentHandle(self, key, document, name)
+
+        # Only one session extracts a given book; the others wait and then share it
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        try:
+            with build_lock:
+                document = self._acquire(key)
+                if document is None:
+                    document = self._load_from_disk(key)
+                    if document is None:
+                        logger.info(f"Extracting document {key[:12]}")
+                        document = build()
+                        self._save_to_disk(key, document)
+                    with self._lock:
+                        entry = self._entries.setdefault(key, _Entry(document))
+                        entry.refcount += 1
+                        document = entry.document
+        finally:
+            with self._lock:
+                self._build_locks.pop(key, None)
+        return DocumentHandle(self, key, document, name)
+
+    def _acquire(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.refcount += 1
+            self._entries.move_to_end(key)
+            return entry.document
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refcount -= 1
+            if entry.refcount <= 0:
+                self._entries.move_to_end(key)
+                self._evict_idle()
+
+    def _evict_idle(self):
+        idle = [key for key, entry in self._entries.items() if entry.refcount <= 0]
+        for key in idle[:max(len(idle) - self.max_idle, 0)]:
+            logger.info(f"Evicting document {key[:12]}")
+            del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._entries),
+                "attached": sum(1 for entry in self._entries.values() if entry.refcount > 0),
+                "references": sum(entry.refcount for entry in self._entries.values()),
+            }
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_from_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            # Files from an older layout or not written by this store get re-extracted
+            document = Document(
+                data["text"],
+                [Page(*page) for page in data["pages"]],
+                [Chunk(*chunk) for chunk in data["chunks"]],
+            )
+            # The modification time doubles as last use for disk eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable cached document {key[:12]}: {e!r}")
+            return None
+        return document
+
+    def _save_to_disk(self, key, document):
+        if not self.cache_dir:
+            return
+        data = {
+            "text": document.text,
+            "pages": [(page.number, page.start, page.end) for page in document.pages],
+            "chunks": [
+                (chunk.start, chunk.end, chunk.first_page, chunk.last_page)
+                for chunk in document.chunks
+            ],
+        }
+        try:
+            # Write to a temporary file first so other processes never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._cache_path(key))
+        except OSError as e:
+            logger.warning(f"Could not cache document {key[:12]} to disk: {e}")
+        self._evict_disk()
+
+    # Drop cached books unused for longer than max_disk_age, then the least recently
+    # used ones beyond max_disk_files. Other processes may be evicting concurrently,
+    # so files that have already gone are skipped.
+    def _evict_disk(self):
+        cached = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                cached.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        cached.sort(reverse=True)
+
+        oldest_allowed = time.time() - self.max_disk_age
+        for index, (modified, path) in enumerate(cached):
+            if index >= self.max_disk_files or modified < oldest_allowed:
+                try:
+                    os.remove(path)
+                    logger.info(f"Evicted cached document {os.path.basename(path)[:12]} from disk")
+                except OSError:
+                    pass
+
+
+# The store shared by every session in this server process
+@lru_cache(maxsize=None)
+def get_document_store():
+    return DocumentStore(
+        max_idle=int(os.getenv("DOCUMENT_STORE_MAX_IDLE", "8")),
+        cache_dir=os.getenv("DOCUMENT_STORE_DIR") or None,
+        max_disk_files=int(os.getenv("DOCUMENT_STORE_MAX_FILES", "64")),
+        max_disk_age=float(os.getenv("DOCUMENT_STORE_MAX_AGE_DAYS", "30")) * 24 * 3600,
+    )
@@ -0,0 +1,130 @@
+import argparse
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_fusion import PARTIAL_ANSWER_MARKER, answer_question
+from document import Document
+from document_store import DocumentStore
+from model_backend import StubBackend, create_model_backend
+from prompts import COMPARISON_PROMPTS
+from report_export import EXPORT_FORMATS, export_report
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTIONS = (
+    "What does the book say about sharing with friends?",
+    "Which activities help children understand honesty?",
+    "How does the book explain respect for elders?",
+)
+
+
+# Function to load a book from a text file, using form feeds as page breaks
+def load_book_pages(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().split("\f")
+
+
+# Function to make a synthetic book when no text files are given
+def synthetic_book_pages(pages, seed):
+    sentence = f"Book {seed} teaches children about sharing, honesty and respect for elders. "
+    return [f"Chapter {number // 10 + 1}, page {number}. " + sentence * 40 for number in range(1, pages + 1)]
+
+
+# One simulated reviewer: open both books, compare them, export the report and ask questions
+def run_session(session, books, store, backend, build_prompt, questions, export_format, timings, errors, lock):
+    handles = []
+    try:
+        for name, pages in books:
+            data = "\f".join(pages).encode("utf-8")
+            handles.append(store.attach(data, name, lambda pages=pages: Document.from_pages(pages)))
+        documents = [handle.document for handle in handles]
+        names = [handle.name for handle in handles]
+
+        started = time.perf_counter()
+        comparison = backend.generate(build_prompt(documents, names))
+        export_report(comparison, export_format)
+        _record(timings, lock, "comparison", time.perf_counter() - started)
+
+        for question in questions:
+            started = time.perf_counter()
+            answer_question(question, documents[1], names[1], backend.generate)
+            _record(timings, lock, "question", time.perf_counter() - started)
+    except Exception as e:
+        logger.warning(f"Session {session} failed: {e}")
+        with lock:
+            errors.append(e)
+    finally:
+        for handle in handles:
+            handle.release()
+
+
+def _record(timings, lock, kind, seconds):
+    with lock:
+        timings.setdefault(kind, []).append(seconds)
+
+
+def _summary(values):
+    values = sorted(values)
+    p95 = values[min(int(len(values) * 0.95), len(values) - 1)]
+    return f"n={len(values)} mean={statistics.mean(values):.3f}s p50={statistics.median(values):.3f}s p95={p95:.3f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the comparison pipeline against a model backend.")
+    parser.add_argument("--backend", default="stub", choices=("stub", "replay", "record", "gemini"))
+    parser.add_argument("--sessions", type=int, default=20, help="number of simulated reviewers")
+    parser.add_argument("--concurrency", type=int, default=10, help="sessions running at the same time")
+    parser.add_argument("--books", nargs=2, metavar="TEXT_FILE", help="two text files (pages split by form feeds)")
+    parser.add_argument("--pages", type=int, default=100, help="pages per synthetic book")
+    parser.add_argument("--prompt", default="ncert", choices=sorted(COMPARISON_PROMPTS),
+                        help="comparison prompt to send (ncert is the one chatbot.py uses)")
+    parser.add_argument("--export-format", default="PDF", choices=sorted(EXPORT_FORMATS))
+    parser.add_argument("--latency", type=float, default=0.2, help="stub: seconds per call")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="stub: simulated output rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stub: probability a call fails")
+    parser.add_argument("--seed", type=int, default=0, help="stub: seed for error injection")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.backend == "stub":
+        backend = StubBackend(
+            latency=args.latency,
+            tokens_per_second=args.tokens_per_second,
+            error_rate=args.error_rate,
+            seed=args.seed,
+            json_reply_marker=PARTIAL_ANSWER_MARKER,
+        )
+    else:
+        backend = create_model_backend(args.backend, json_reply_marker=PARTIAL_ANSWER_MARKER)
+
+    if args.books:
+        books = [(path, load_book_pages(path)) for path in args.books]
+    else:
+        books = [(f"book{seed}.pdf", synthetic_book_pages(args.pages, seed)) for seed in (1, 2)]
+
+    store = DocumentStore()
+    timings = {}
+    errors = []
+    lock = threading.Lock()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for session in range(args.sessions):
+            executor.submit(
+                run_session, session, books, store, backend, COMPARISON_PROMPTS[args.prompt], DEFAULT_QUESTIONS,
+                args.export_format, timings, errors, lock,
+            )
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.sessions} sessions in {elapsed:.2f}s ({args.sessions / elapsed:.2f} sessions/s), {len(errors)} failed")
+    for kind, values in sorted(timings.items()):
+        print(f"{kind}: {_summary(values)}")
+    print(f"document store: {store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
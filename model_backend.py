@@ -0,0 +1,149 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+class BackendError(Exception):
+    pass
+
+
+# Interface every model backend implements: send one prompt, get the reply text
+class ModelBackend(ABC):
+    @abstractmethod
+    def generate(self, prompt):
+        pass
+
+
+# Google Gemini, the backend the app has always used
+class GeminiBackend(ModelBackend):
+    def __init__(self, model_name="gemini-pro", api_key=None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or os.getenv("GOOGLE_API_KEY"))
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt):
+        response = self.model.generate_content(prompt)
+        return response.text
+
+
+# Offline backend for load testing. Replies take `latency` seconds plus the time to
+# "stream" the reply at `tokens_per_second`, and fail with probability `error_rate`.
+# Prompts containing `json_reply_marker` (the caller's marker for prompts that expect
+# a {"relevance", "answer"} JSON object) get valid JSON back.
+class StubBackend(ModelBackend):
+    def __init__(
+        self,
+        latency=0.0,
+        tokens_per_second=None,
+        error_rate=0.0,
+        reply_words=150,
+        seed=None,
+        json_reply_marker=None,
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.reply_words = reply_words
+        self.json_reply_marker = json_reply_marker
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.error_rate
+        if fail:
+            time.sleep(self.latency)
+            raise BackendError("Injected stub backend error")
+
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        if self.json_reply_marker and self.json_reply_marker in prompt:
+            # Derived from the prompt so replays of a run score chunks the same way
+            relevance = round(int(digest[:4], 16) / 0xFFFF, 2)
+            reply = json.dumps({"relevance": relevance, "answer": f"Stub answer {digest[:8]}."})
+        else:
+            words = [f"stub{digest[i % 64]}" for i in range(self.reply_words)]
+            reply = " ".join(words)
+
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += len(reply.split()) / self.tokens_per_second
+        time.sleep(delay)
+        return reply
+
+
+# Captures replies from another backend to disk ("record") and serves them back
+# without the network ("replay"). Recordings are keyed by a hash of the prompt.
+class RecordReplayBackend(ModelBackend):
+    def __init__(self, directory, backend=None, mode="replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == "record" and backend is None:
+            raise ValueError("Recording needs a backend to record from")
+        self.directory = directory
+        self.backend = backend
+        self.mode = mode
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, prompt):
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def generate(self, prompt):
+        path = self._path(prompt)
+        if self.mode == "replay":
+            try:
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)["response"]
+            except FileNotFoundError:
+                raise BackendError(f"No recording for prompt {os.path.basename(path)}") from None
+
+        response = self.backend.generate(prompt)
+        # Write to a temporary file first so concurrent sessions never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"prompt": prompt, "response": response}, f)
+        os.replace(tmp_path, path)
+        return response
+
+
+# Function to build the backend selected by the LLM_BACKEND environment variable:
+# gemini (default), stub, record or replay. `json_reply_marker` is passed on to the stub.
+def create_model_backend(name=None, json_reply_marker=None):
+    name = (name or os.getenv("LLM_BACKEND") or "gemini").lower()
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "stub":
+        tokens_per_second = os.getenv("LLM_STUB_TOKENS_PER_SECOND")
+        seed = os.getenv("LLM_STUB_SEED")
+        return StubBackend(
+            latency=float(os.getenv("LLM_STUB_LATENCY", "0")),
+            tokens_per_second=float(tokens_per_second) if tokens_per_second else None,
+            error_rate=float(os.getenv("LLM_STUB_ERROR_RATE", "0")),
+            seed=int(seed) if seed else None,
+            json_reply_marker=json_reply_marker,
+        )
+    if name in ("record", "replay"):
+        directory = os.getenv("LLM_RECORDINGS_DIR", "llm_recordings")
+        backend = GeminiBackend() if name == "record" else None
+        return RecordReplayBackend(directory, backend=backend, mode=name)
+    raise ValueError(f"Unknown LLM_BACKEND: {name}")
+
+
+# The backend shared by every session in this server process
+@lru_cache(maxsize=None)
+def get_model_backend(json_reply_marker=None):
+    backend = create_model_backend(json_reply_marker=json_reply_marker)
+    logger.info(f"Using model backend {type(backend).__name__}")
+    return backend
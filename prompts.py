@@ -0,0 +1,76 @@
+# Prompt builders shared by the Streamlit apps and load_test.py, so the load test
+# sends exactly the prompts production does.
+
+
+# Prompt used by chatbot.py: chapter-by-chapter alignment of the second book with NCERT guidelines
+def build_ncert_comparison_prompt(documents, names):
+    textbook1_name = names[0]
+    textbook2_name = names[1]
+
+    return (
+        f"Conduct a comparative analysis of the following two textbooks. The first textbook is '{textbook1_name}', and the second textbook is '{textbook2_name}'. This analysis is intended for educators, curriculum developers, and parents to evaluate how well '{textbook2_name}' aligns with NCERT guidelines:\n\n"
+        f"Textbook 1 ({textbook1_name}):\n{documents[0].text}\n\n"
+        f"Textbook 2 ({textbook2_name}):\n{documents[1].text}\n\n"
+        "Provide a detailed analysis of each chapter in '{textbook2_name}', focusing on its alignment with NCERT guidelines. For each chapter, address the following:\n\n"
+        "  {chapter_name} - Alignment with NCERT Guidelines**:\n"
+        "  1. What are the strengths of the chapter '{chapter_name}' in terms of content coverage, clarity, relevance to learning objectives, and use of age-appropriate examples?provide atleast six to ten points \n"
+        "  2. Provide constructive suggestions for improving '{chapter_name}', including additional pictures, activities, exercises, and examples that could be added to better align with NCERT guidelines.\n"
+        "  3. Give specific and age-appropriate examples that could help enhance the understanding of six-year-old children.\n"
+        "  4. Identify any unique elements in '{chapter_name}' that make it particularly effective for achieving the NCERT learning objectives.\n\n"
+        "  5. Overall, summarize the alignment of '{textbook2_name}' with NCERT guidelines, focusing on how its chapters provide a valuable learning experience while adhering to NCERT standards."
+        "  6. List all the diffcult words used in this books chapter that can be diffcult to understand by the six to seven years old children or class 1 students also give me the suggestion to replace those difficult words."
+    )
+
+
+# Prompt used by test2.py: topic, clarity and accuracy comparison plus NCERT-based improvements
+def build_topic_comparison_prompt(documents, names):
+    return (
+        f"Compare the following two textbooks and determine which one is better based on their content.\n\n"
+        f"Textbook 1 ({names[0]}):\n{documents[0].text}\n\n"
+        f"Textbook 2 ({names[1]}):\n{documents[1].text}\n\n"
+        "1. **Topics Covered:** List the topics covered in each textbook point by point.\n"
+        "2. **Clarity:** Analyze the clarity of explanations for each topic.\n"
+        "3. **Accuracy:** Assess the accuracy of the information presented in each topic.\n"
+        "4. **Depth of Coverage:** Evaluate the depth to which each topic is covered.\n"
+        "5. **Usefulness for Learning:** Compare how useful each textbook is for learning the subject.\n"
+        "6. **Additional Insights:** Identify any unique insights or additional information provided by each textbook.\n"
+        "7. **Overall Comparison:** Provide an overall comparison, emphasizing that both textbooks are great resources.\n"
+        "what are the improvements can be done on the particular published book based on ncert book."
+    )
+
+
+# Prompt used by removequestionpart.py: the same comparison with suggestions for both books
+def build_topic_comparison_with_suggestions_prompt(documents, names):
+    return (
+        f"Compare the following two textbooks and determine which one is better based on their content.\n\n"
+        f"Textbook 1 ({names[0]}):\n{documents[0].text}\n\n"
+        f"Textbook 2 ({names[1]}):\n{documents[1].text}\n\n"
+        "1. **Topics Covered:** List the topics covered in each textbook point by point.\n"
+        "2. **Clarity:** Analyze the clarity of explanations for each topic.\n"
+        "3. **Accuracy:** Assess the accuracy of the information presented in each topic.\n"
+        "4. **Depth of Coverage:** Evaluate the depth to which each topic is covered.\n"
+        "5. **Usefulness for Learning:** Compare how useful each textbook is for learning the subject.\n"
+        "6. **Additional Insights:** Identify any unique insights or additional information provided by each textbook.\n"
+        "7. **Overall Comparison:** Provide an overall comparison, emphasizing that both textbooks are great resources.\n"
+        "8. **Suggestions for Improvement:** Suggest any improvements or additional content that could be added to enhance both textbooks."
+    )
+
+
+# Prompt used by testapp.py: overall quality comparison
+def build_quality_comparison_prompt(documents, names):
+    return (
+        f"Compare the following two textbooks and determine which one is better based on their content.\n\n"
+        f"Textbook 1 ({names[0]}):\n{documents[0].text}\n\n"
+        f"Textbook 2 ({names[1]}):\n{documents[1].text}\n\n"
+        "Provide a detailed analysis including which textbook has better coverage of topics, clarity of explanations, accuracy of information, "
+        "and overall quality of the content. Additionally, consider how well each textbook addresses the subject matter and its usefulness for learning."
+    )
+
+
+# Comparison prompt builders by name, for picking one in load_test.py
+COMPARISON_PROMPTS = {
+    "ncert": build_ncert_comparison_prompt,
+    "topics": build_topic_comparison_prompt,
+    "topics-with-suggestions": build_topic_comparison_with_suggestions_prompt,
+    "quality": build_quality_comparison_prompt,
+}
@@ -0,0 +1,174 @@
+import html
+import logging
+import os
+import re
+
+from fpdf import FPDF
+
+logger = logging.getLogger(__name__)
+
+# TrueType fonts tried for PDF export so text outside Latin-1 (curly quotes,
+# dashes, symbols from the model) renders. REPORT_FONT_PATH takes precedence.
+PDF_FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    r"C:\Windows\Fonts\arial.ttf",
+)
+
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_BULLET = re.compile(r"^\s*[-*+]\s+(.*)$")
+_NUMBERED = re.compile(r"^\s*(\d+)[.)]\s+(.*)$")
+
+
+# Function to render a comparison result as a Markdown report
+def render_markdown(comparison_text, title="Textbook Comparison"):
+    return f"# {title}\n\n{comparison_text.strip()}\n".encode("utf-8")
+
+
+# Function to render a comparison result as a standalone HTML report.
+# Handles the subset of Markdown the model produces: headings, lists and bold.
+def render_html(comparison_text, title="Textbook Comparison"):
+    parts = [
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n",
+        f"<title>{html.escape(title)}</title>\n</head>\n<body>\n",
+        f"<h1>{html.escape(title)}</h1>\n",
+    ]
+    # "ul" or "ol" while inside a list
+    list_tag = None
+    for line in comparison_text.splitlines():
+        heading = _HEADING.match(line)
+        bullet = _BULLET.match(line)
+        numbered = _NUMBERED.match(line)
+        item_tag = "ul" if bullet else "ol" if numbered else None
+        if list_tag and list_tag != item_tag:
+            parts.append(f"</{list_tag}>\n")
+            list_tag = None
+        if heading:
+            level = min(len(heading.group(1)) + 1, 6)
+            parts.append(f"<h{level}>{_inline_html(heading.group(2))}</h{level}>\n")
+        elif bullet:
+            if not list_tag:
+                parts.append("<ul>\n")
+                list_tag = "ul"
+            parts.append(f"<li>{_inline_html(bullet.group(1))}</li>\n")
+        elif numbered:
+            if not list_tag:
+                # Keep the model's numbering when a list resumes after other content
+                parts.append(f"<ol start=\"{int(numbered.group(1))}\">\n")
+                list_tag = "ol"
+            parts.append(f"<li>{_inline_html(numbered.group(2))}</li>\n")
+        elif line.strip():
+            parts.append(f"<p>{_inline_html(line)}</p>\n")
+    if list_tag:
+        parts.append(f"</{list_tag}>\n")
+    parts.append("</body>\n</html>\n")
+    return "".join(parts).encode("utf-8")
+
+
+def _inline_html(text):
+    return _BOLD.sub(r"<strong>\1</strong>", html.escape(text.strip()))
+
+
+# Function to render a comparison result as a PDF report.
+# Lines are wrapped here with cached glyph widths and drawn with pdf.text, which
+# is linear in the text size; FPDF's multi_cell re-measures every line fragment
+# per character and takes seconds on long reports.
+def render_pdf(comparison_text, title="Textbook Comparison"):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=False)
+    pdf.add_page()
+
+    font_path = _find_pdf_font()
+    if font_path:
+        pdf.add_font("ReportFont", "", font_path)
+        family = "ReportFont"
+    else:
+        # Core fonts only cover Latin-1, so replace anything they cannot draw
+        logger.warning("No Unicode font found for PDF export; falling back to Helvetica.")
+        family = "Helvetica"
+        title = title.encode("latin-1", "replace").decode("latin-1")
+        comparison_text = comparison_text.encode("latin-1", "replace").decode("latin-1")
+
+    y = pdf.t_margin
+    for text, font_size, line_height in ((title, 16, 10), (comparison_text.strip(), 12, 7)):
+        pdf.set_font(family, size=font_size)
+        for line in _wrap_lines(pdf, text):
+            if y + line_height > pdf.h - pdf.b_margin:
+                pdf.add_page()
+                y = pdf.t_margin
+            if line:
+                pdf.text(pdf.l_margin, y + line_height * 0.7, line)
+            y += line_height
+        y += 4
+    return bytes(pdf.output())
+
+
+# Greedy word wrap of text to the page width of the current font
+def _wrap_lines(pdf, text):
+    widths = {}
+
+    def width(s):
+        total = 0
+        for ch in s:
+            ch_width = widths.get(ch)
+            if ch_width is None:
+                ch_width = widths[ch] = pdf.get_string_width(ch)
+            total += ch_width
+        return total
+
+    max_width = pdf.epw
+    space_width = width(" ")
+    lines = []
+    for source_line in text.expandtabs(4).split("\n"):
+        current = []
+        current_width = 0
+        for word in source_line.split(" "):
+            word_width = width(word)
+            # Words wider than the page are broken across lines character by character
+            while word_width > max_width:
+                if current:
+                    lines.append(" ".join(current))
+                    current, current_width = [], 0
+                cut, cut_width = 0, 0
+                while cut < len(word) - 1 and cut_width + width(word[cut]) <= max_width:
+                    cut_width += width(word[cut])
+                    cut += 1
+                lines.append(word[:max(cut, 1)])
+                word = word[max(cut, 1):]
+                word_width = width(word)
+            if current and current_width + space_width + word_width > max_width:
+                lines.append(" ".join(current))
+                current, current_width = [word], word_width
+            else:
+                current_width += (space_width if current else 0) + word_width
+                current.append(word)
+        lines.append(" ".join(current))
+    return lines
+
+
+def _find_pdf_font():
+    font_path = os.getenv("REPORT_FONT_PATH")
+    if font_path:
+        if os.path.isfile(font_path):
+            return font_path
+        logger.warning(f"REPORT_FONT_PATH {font_path} does not exist; looking for a system font instead.")
+    for candidate in PDF_FONT_CANDIDATES:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+# Export formats offered in the app: label -> (file extension, MIME type, renderer)
+EXPORT_FORMATS = {
+    "PDF": ("pdf", "application/pdf", render_pdf),
+    "Markdown": ("md", "text/markdown", render_markdown),
+    "HTML": ("html", "text/html", render_html),
+}
+
+
+# Function to render a report into memory, ready for st.download_button
+def export_report(comparison_text, export_format, title="Textbook Comparison"):
+    extension, mime, render = EXPORT_FORMATS[export_format]
+    return render(comparison_text, title), f"comparison_result.{extension}", mime
@@ -1,11 +1,13 @@
-import os
 import io
 import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image
 import streamlit as st
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import google.generativeai as genai
+from answer_fusion import PARTIAL_ANSWER_MARKER, answer_question
+from document import Document
+from document_store import get_document_store
+from model_backend import get_model_backend
+from prompts import build_topic_comparison_prompt
 from dotenv import load_dotenv
 import pdfplumber
 import logging
@@ -13,43 +15,41 @@ import logging
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API key
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Books extracted by any session are shared through the process-wide store
+document_store = get_document_store()
 
-# Initialize Gemini Pro model
-model = genai.GenerativeModel("gemini-pro")
-chat = model.start_chat(history=[])
+# Initialize the model backend (Gemini Pro unless LLM_BACKEND selects the stub or a recording)
+model = get_model_backend(json_reply_marker=PARTIAL_ANSWER_MARKER)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Function to extract text from a PDF using PyMuPDF and pdfplumber with OCR for images
-def extract_text_from_pdf(file):
-    text = ""
+# Function to extract per-page text from a PDF using PyMuPDF and pdfplumber with OCR for images
+def extract_pages_from_pdf(file):
+    pages = []
     try:
         with pdfplumber.open(file) as pdf:
             for page in pdf.pages:
                 page_text = page.extract_text()
-                if page_text:
-                    text += page_text
                 
                 if not page_text.strip():
                     page_image = page.to_image()
                     ocr_text = pytesseract.image_to_string(page_image.original, config='--psm 6')
-                    text += ocr_text
+                    page_text += ocr_text
+                pages.append(page_text)
                     
     except Exception as e:
         logger.error(f"pdfplumber failed: {e}")
         logger.info("Falling back to PyMuPDF for text extraction.")
         
+        pages = []
         file.seek(0)
         pdf_document = fitz.open(stream=file.read(), filetype="pdf")
 
         for page_num in range(len(pdf_document)):
             page = pdf_document.load_page(page_num)
             page_text = page.get_text("text")
-            text += page_text
 
             if not page_text.strip():
                 image_list = page.get_images(full=True)
@@ -59,49 +59,32 @@ def extract_text_from_pdf(file):
                     image_bytes = base_image["image"]
                     image = Image.open(io.BytesIO(image_bytes))
                     ocr_text = pytesseract.image_to_string(image, config='--psm 6')
-                    text += ocr_text
-
-    return text
-
-# Function to chunk text using RecursiveCharacterTextSplitter
-def chunk_text(text, chunk_size=10000, chunk_overlap=1000):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    return text_splitter.split_text(text)
-
-# Function to get response from Gemini based on the PDF content and user query
-def get_gemini_response(question, context_chunks, textbook_name):
-    responses = []
-    for chunk in context_chunks:
-        full_prompt = f"Context from {textbook_name}:\n{chunk}\n\nBased on the above context, please answer the following question:\n\n{question}"
-        logger.info(f"Sending prompt to Gemini: {full_prompt}")  # Debug log
-        response = chat.send_message(full_prompt, stream=True)
-        response.resolve()
-        logger.info(f"Received response from Gemini: {response.text}")  # Debug log
-        responses.append(response)
-    
-    combined_response = " ".join(response.text for response in responses)
-    return combined_response.strip()
+                    page_text += ocr_text
+            pages.append(page_text)
+
+    return pages
+
+# Function to extract a PDF into a Document (one text buffer with page and chunk offsets)
+def extract_document_from_pdf(file):
+    return Document.from_pages(extract_pages_from_pdf(file))
+
+# Function to send a single, stateless prompt to Gemini and return the reply text
+def generate_text(prompt):
+    logger.info(f"Sending prompt to Gemini: {prompt}")  # Debug log
+    response_text = model.generate(prompt)
+    logger.info(f"Received response from Gemini: {response_text}")  # Debug log
+    return response_text
+
+# Function to get a single fused answer with page citations from the PDF content
+def get_gemini_response(question, document, textbook_name):
+    return answer_question(question, document, textbook_name, generate_text)
 
 # Function to compare textbooks (PDFs) and include names
-def compare_textbooks(texts, names):
-    if len(texts) == 2:
-        full_prompt = (
-            f"Compare the following two textbooks and determine which one is better based on their content.\n\n"
-            f"Textbook 1 ({names[0]}):\n{texts[0]}\n\n"
-            f"Textbook 2 ({names[1]}):\n{texts[1]}\n\n"
-            "1. **Topics Covered:** List the topics covered in each textbook point by point.\n"
-            "2. **Clarity:** Analyze the clarity of explanations for each topic.\n"
-            "3. **Accuracy:** Assess the accuracy of the information presented in each topic.\n"
-            "4. **Depth of Coverage:** Evaluate the depth to which each topic is covered.\n"
-            "5. **Usefulness for Learning:** Compare how useful each textbook is for learning the subject.\n"
-            "6. **Additional Insights:** Identify any unique insights or additional information provided by each textbook.\n"
-            "7. **Overall Comparison:** Provide an overall comparison, emphasizing that both textbooks are great resources.\n"
-            "what are the improvements can be done on the particular published book based on ncert book."
-        )
+def compare_textbooks(documents, names):
+    if len(documents) == 2:
+        full_prompt = build_topic_comparison_prompt(documents, names)
         logger.info(f"Sending comparison prompt to Gemini: {full_prompt}")  
-        response = chat.send_message(full_prompt, stream=True)
-        response.resolve()
-        comparisons = response.text
+        comparisons = model.generate(full_prompt)
         logger.info(f"Received comparison response from Gemini: {comparisons}")  
     else:
         comparisons = "Error: Need exactly two textbooks for comparison."
@@ -122,25 +105,26 @@ with st.sidebar:
 # Main content
 if 'chat_history' not in st.session_state:
     st.session_state['chat_history'] = []
-if 'textbook_chunks' not in st.session_state:
-    st.session_state['textbook_chunks'] = []
-if 'textbook_names' not in st.session_state:
-    st.session_state['textbook_names'] = []
+if 'textbook_handles' not in st.session_state:
+    st.session_state['textbook_handles'] = []
 
 if uploaded_files and submit:
-    pdf_texts = []
-    pdf_names = []
+    pdf_handles = []
 
     for uploaded_file in uploaded_files:
         logger.info(f"Processing file: {uploaded_file.name}")
         try:
             uploaded_file.seek(0)
-            pdf_text = extract_text_from_pdf(uploaded_file)
+            pdf_handle = document_store.attach(
+                uploaded_file.getvalue(),
+                uploaded_file.name,
+                lambda: extract_document_from_pdf(uploaded_file),
+            )
             
-            if pdf_text.strip():
-                pdf_texts.append(pdf_text)
-                pdf_names.append(uploaded_file.name)
+            if pdf_handle.document.text.strip():
+                pdf_handles.append(pdf_handle)
             else:
+                pdf_handle.release()
                 st.write(f"Text extraction failed for {uploaded_file.name}.")
                 logger.warning(f"Text extraction failed for {uploaded_file.name}.")
         except Exception as e:
@@ -148,11 +132,14 @@ if uploaded_files and submit:
             logger.error(f"Error processing {uploaded_file.name}: {e}")
     
     try:
-        if len(pdf_texts) == 2:
-            st.session_state['textbook_chunks'] = [chunk_text(text) for text in pdf_texts]
-            st.session_state['textbook_names'] = pdf_names
-
-            comparisons = compare_textbooks(pdf_texts, pdf_names)
+        if len(pdf_handles) == 2:
+            for handle in st.session_state['textbook_handles']:
+                handle.release()
+            st.session_state['textbook_handles'] = pdf_handles
+            pdf_documents = [handle.document for handle in pdf_handles]
+            pdf_names = [handle.name for handle in pdf_handles]
+
+            comparisons = compare_textbooks(pdf_documents, pdf_names)
             st.subheader("Comparison Result:")
             st.write(comparisons)
 
@@ -164,10 +151,10 @@ if uploaded_files and submit:
                     logger.info("Ask Question button clicked!")  # Debug log
                     logger.info(f"Input text provided: {input_text}")  # Debug log
                     selected_index = pdf_names.index(selected_textbook)
-                    selected_chunks = st.session_state['textbook_chunks'][selected_index]
+                    selected_document = st.session_state['textbook_handles'][selected_index].document
 
-                    if selected_chunks:
-                        response = get_gemini_response(input_text, selected_chunks, selected_textbook)
+                    if selected_document.chunks:
+                        response = get_gemini_response(input_text, selected_document, selected_textbook)
                         st.session_state['chat_history'].append(("You", input_text))
                         st.session_state['chat_history'].append(("Bot", response))
                         st.subheader("The Response is")
@@ -178,6 +165,8 @@ if uploaded_files and submit:
                     st.write("Please provide a question to ask.")
                     logger.warning("No input text provided.")  # Debug log
         else:
+            for handle in pdf_handles:
+                handle.release()
             st.write("Please upload exactly two PDF documents for comparison.")
     except Exception as e:
         st.write(f"Error: {e}")
@@ -0,0 +1,107 @@
+import json
+
+from answer_fusion import (
+    NO_ANSWER,
+    NO_ANSWER_IN_SEARCHED,
+    PARTIAL_ANSWER_MARKER,
+    answer_question,
+    parse_partial_answer,
+    rank_chunks,
+)
+from document import Document
+
+
+# One page per chunk, each mentioning "sharing" so every chunk is asked
+def make_document(pages=6):
+    return Document.from_pages(
+        [f"Page {number} is about sharing.\n\n" for number in range(1, pages + 1)],
+        chunk_size=40,
+        chunk_overlap=0,
+    )
+
+
+# Fake model: partial-answer prompts get the reply for their page, fusion prompts get "fused"
+class FakeModel:
+    def __init__(self, replies):
+        self.replies = replies
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        if PARTIAL_ANSWER_MARKER not in prompt:
+            return " fused "
+        page = int(prompt.split("(pages ", 1)[1].split(")", 1)[0])
+        return self.replies.get(page, json.dumps({"relevance": 0, "answer": ""}))
+
+
+def reply(relevance, answer):
+    return json.dumps({"relevance": relevance, "answer": answer})
+
+
+def test_stops_once_enough_confident_answers():
+    model = FakeModel({page: reply(0.9, f"answer {page}") for page in range(1, 7)})
+    answer = answer_question("sharing?", make_document(), "book.pdf", model.generate, enough_evidence=3)
+    assert answer == "fused"
+    # Three partial-answer prompts, then one fusion prompt
+    assert len(model.prompts) == 4
+    assert "[p. 1] answer 1" in model.prompts[-1]
+
+
+def test_asks_every_chunk_without_confident_evidence():
+    model = FakeModel({})
+    answer = answer_question("sharing?", make_document(), "book.pdf", model.generate)
+    assert answer == NO_ANSWER
+    assert len(model.prompts) == 6
+
+
+def test_max_chunks_cap_does_not_claim_whole_book():
+    model = FakeModel({})
+    answer = answer_question("sharing?", make_document(), "book.pdf", model.generate, max_chunks=2)
+    assert answer == NO_ANSWER_IN_SEARCHED
+    assert len(model.prompts) == 2
+
+
+def test_weak_and_empty_partials_are_dropped():
+    model = FakeModel({2: reply(0.3, "weak"), 3: reply(0.9, ""), 4: reply(0.6, "kept")})
+    answer = answer_question("sharing?", make_document(), "book.pdf", model.generate)
+    assert answer == "kept (p. 4)"
+    assert len(model.prompts) == 6
+
+
+def test_only_the_most_relevant_partials_are_fused():
+    replies = {1: reply(0.5, "low"), 2: reply(0.7, "mid"), 3: reply(0.6, "other")}
+    model = FakeModel(replies)
+    answer_question("sharing?", make_document(), "book.pdf", model.generate, max_partials=2)
+    fusion_prompt = model.prompts[-1]
+    assert "[p. 2] mid" in fusion_prompt
+    assert "[p. 3] other" in fusion_prompt
+    assert "[p. 1]" not in fusion_prompt
+
+
+def test_citation_spans_pages():
+    document = Document.from_pages(["sharing " * 3, "sharing " * 3], chunk_size=100, chunk_overlap=0)
+    answer = answer_question("sharing?", document, "book.pdf", lambda prompt: reply(0.9, "both"))
+    assert answer == "both (pp. 1-2)"
+
+
+def test_rank_chunks_prefers_matching_chunks():
+    document = Document.from_pages(
+        ["Rivers flow.\n\n", "Children are giving gifts.\n\n", "Mountains rise.\n\n"],
+        chunk_size=30,
+        chunk_overlap=0,
+    )
+    ranked = rank_chunks("Why do children give gifts?", document)
+    assert [chunk.first_page for chunk in ranked] == [2]
+    # No chunk matches, so every chunk is kept in book order
+    assert [chunk.first_page for chunk in rank_chunks("volcanoes?", document)] == [1, 2, 3]
+
+
+def test_parse_partial_answer():
+    assert parse_partial_answer('Sure: {"relevance": 0.75, "answer": " yes "}') == (0.75, "yes")
+    assert parse_partial_answer('{"relevance": 7, "answer": "x"}') == (1.0, "x")
+    assert parse_partial_answer('{"relevance": "high", "answer": "x"}') == (0.0, "")
+    assert parse_partial_answer('{"relevance": NaN, "answer": "x"}') == (0.0, "")
+    assert parse_partial_answer('{"relevance": Infinity, "answer": "x"}') == (0.0, "")
+    assert parse_partial_answer("[1, 2]") == (0.0, "")
+    assert parse_partial_answer("not json") == (0.0, "")
+    assert parse_partial_answer(None) == (0.0, "")
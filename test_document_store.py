@@ -0,0 +1,123 @@
+import gc
+import os
+import threading
+import time
+
+from document import Document
+from document_store import DocumentStore, content_hash
+
+
+def make_document(text="Some pages of a book."):
+    return Document.from_pages([text])
+
+
+def test_concurrent_attach_builds_once():
+    store = DocumentStore()
+    builds = []
+    started = threading.Barrier(8)
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        return make_document()
+
+    handles = []
+
+    def attach():
+        started.wait()
+        handles.append(store.attach(b"book", "book.pdf", build))
+
+    threads = [threading.Thread(target=attach) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(handle.document) for handle in handles}) == 1
+    assert store.stats() == {"documents": 1, "attached": 1, "references": 8}
+
+
+def test_handles_keep_their_own_name():
+    store = DocumentStore()
+    first = store.attach(b"book", "alice.pdf", make_document)
+    second = store.attach(b"book", "bob.pdf", make_document)
+    assert first.document is second.document
+    assert (first.name, second.name) == ("alice.pdf", "bob.pdf")
+
+
+def test_release_and_garbage_collection_drop_references():
+    store = DocumentStore()
+    first = store.attach(b"book", "book.pdf", make_document)
+    second = store.attach(b"book", "book.pdf", make_document)
+    first.release()
+    # Releasing twice must not drop the other session's reference
+    first.release()
+    assert store.stats()["references"] == 1
+
+    del second
+    gc.collect()
+    assert store.stats() == {"documents": 1, "attached": 0, "references": 0}
+
+
+def test_idle_documents_beyond_max_idle_are_evicted():
+    store = DocumentStore(max_idle=2)
+    attached = store.attach(b"attached", "attached.pdf", make_document)
+    for index in range(4):
+        store.attach(f"idle {index}".encode(), "idle.pdf", make_document).release()
+    assert store.stats() == {"documents": 3, "attached": 1, "references": 1}
+
+    # The two most recently used idle documents are the ones kept
+    builds = []
+    for index in (3, 2, 0):
+        store.attach(f"idle {index}".encode(), "idle.pdf", lambda: builds.append(index) or make_document())
+    assert builds == [0]
+    attached.release()
+
+
+def test_disk_round_trip(tmp_path):
+    document = Document.from_pages(["first page ", "second page"], chunk_size=12, chunk_overlap=0)
+    DocumentStore(cache_dir=str(tmp_path)).attach(b"book", "book.pdf", lambda: document)
+
+    def fail():
+        raise AssertionError("document should come from the disk cache")
+
+    loaded = DocumentStore(cache_dir=str(tmp_path)).attach(b"book", "other.pdf", fail).document
+    assert loaded.text == document.text
+    assert [(page.number, page.start, page.end) for page in loaded.pages] == [
+        (page.number, page.start, page.end) for page in document.pages
+    ]
+    assert [loaded.chunk_text(chunk) for chunk in loaded.chunks] == [
+        document.chunk_text(chunk) for chunk in document.chunks
+    ]
+    assert [(chunk.first_page, chunk.last_page) for chunk in loaded.chunks] == [
+        (chunk.first_page, chunk.last_page) for chunk in document.chunks
+    ]
+
+
+def test_malformed_cache_file_is_re_extracted(tmp_path):
+    store = DocumentStore(cache_dir=str(tmp_path))
+    store.attach(b"book", "book.pdf", make_document).release()
+    (cache_file,) = tmp_path.iterdir()
+    cache_file.write_text('{"foo": 1}', encoding="utf-8")
+
+    document = DocumentStore(cache_dir=str(tmp_path)).attach(b"book", "book.pdf", make_document).document
+    assert document.text == "Some pages of a book."
+
+
+def test_disk_eviction_by_count_and_age(tmp_path):
+    store = DocumentStore(cache_dir=str(tmp_path), max_disk_files=2, max_disk_age=3600)
+    stale = tmp_path / f"{content_hash(b'stale')}.json"
+    stale.write_text("{}", encoding="utf-8")
+    os.utime(stale, (time.time() - 7200,) * 2)
+
+    now = time.time()
+    for index in range(3):
+        store.attach(f"book {index}".encode(), "book.pdf", make_document).release()
+        # Give each book a distinct last use so the least recently used one is well defined
+        cached = tmp_path / f"{content_hash(f'book {index}'.encode())}.json"
+        os.utime(cached, (now - 60 + index,) * 2)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        f"{content_hash(f'book {index}'.encode())}.json" for index in (1, 2)
+    )
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from text_splitter import RecursiveTextSplitter, get_text_splitter
+
+
+def test_empty_text():
+    assert RecursiveTextSplitter(10, 2).split_text("") == []
+
+
+def test_all_whitespace():
+    assert RecursiveTextSplitter(10, 2).split_text(" \n\n \t\n   ") == []
+
+
+def test_chunk_overrunning_chunk_size_is_split_by_character():
+    assert RecursiveTextSplitter(4, 0).split_text("abcdefghij") == ["abcd", "efgh", "ij"]
+
+
+def test_runs_of_separators_stay_with_following_piece():
+    splitter = RecursiveTextSplitter(6, 0)
+    assert splitter.split_text("ab\n\n\ncd\n\n\n\nef") == ["ab", "cd", "ef"]
+    assert splitter.split_spans("ab\n\n\ncd") == [(0, 2), (5, 7)]
+
+
+def test_overlap_carries_previous_words():
+    assert RecursiveTextSplitter(10, 5).split_text("one two three four five") == [
+        "one two",
+        "two three",
+        "four five",
+    ]
+
+
+def test_chunk_overlap_larger_than_chunk_size():
+    with pytest.raises(ValueError):
+        RecursiveTextSplitter(5, 6)
+
+
+def test_get_text_splitter_reuses_instances():
+    assert get_text_splitter(100, 10) is get_text_splitter(100, 10)
+
+
+def test_matches_langchain_on_random_text():
+    text_splitter = pytest.importorskip("langchain.text_splitter")
+    rng = random.Random(1)
+    alphabet = ["a", "b", "word", "\n", "\n\n", " ", "  ", "\t", "é", "\n\n\n", "xyzxyzxyzxyz"]
+    separator_choices = [None, ["\n\n", "\n", " ", ""], ["\n", " "], ["ab", "b", ""], ["\n\n"]]
+    for _ in range(20000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+        chunk_size = rng.randint(1, 40)
+        chunk_overlap = rng.randint(0, chunk_size)
+        separators = rng.choice(separator_choices)
+        expected = text_splitter.RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=separators
+        ).split_text(text)
+        actual = RecursiveTextSplitter(chunk_size, chunk_overlap, separators).split_text(text)
+        assert actual == expected, (text, chunk_size, chunk_overlap, separators)
@@ -1,11 +1,13 @@
-import os
 import io
 import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image
 import streamlit as st
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import google.generativeai as genai
+from answer_fusion import PARTIAL_ANSWER_MARKER, answer_question
+from document import Document
+from document_store import get_document_store
+from model_backend import get_model_backend
+from prompts import build_quality_comparison_prompt
 from dotenv import load_dotenv
 import pdfplumber
 import logging
@@ -13,51 +15,43 @@ import logging
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API key
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Books extracted by any session are shared through the process-wide store
+document_store = get_document_store()
 
-# Initialize Gemini Pro model
-model = genai.GenerativeModel("gemini-pro")
-chat = model.start_chat(history=[])
+# Initialize the model backend (Gemini Pro unless LLM_BACKEND selects the stub or a recording)
+model = get_model_backend(json_reply_marker=PARTIAL_ANSWER_MARKER)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def extract_text_from_pdf(file):
-    text = ""
-    
-    
+# Function to extract per-page text from a PDF using PyMuPDF and pdfplumber with OCR for images
+def extract_pages_from_pdf(file):
+    pages = []
     try:
         with pdfplumber.open(file) as pdf:
             for page in pdf.pages:
-                # Extract text with layout consideration
                 page_text = page.extract_text()
-                if page_text:
-                    text += page_text
                 
-               
                 if not page_text.strip():
                     page_image = page.to_image()
                     ocr_text = pytesseract.image_to_string(page_image.original, config='--psm 6')
-                    text += ocr_text
+                    page_text += ocr_text
+                pages.append(page_text)
                     
     except Exception as e:
         logger.error(f"pdfplumber failed: {e}")
         logger.info("Falling back to PyMuPDF for text extraction.")
         
-        # Fall back to PyMuPDF if pdfplumber fails
-        file.seek(0)  
+        pages = []
+        file.seek(0)
         pdf_document = fitz.open(stream=file.read(), filetype="pdf")
 
         for page_num in range(len(pdf_document)):
             page = pdf_document.load_page(page_num)
-            
             page_text = page.get_text("text")
-            text += page_text
 
-            
             if not page_text.strip():
                 image_list = page.get_images(full=True)
                 for image_index, img in enumerate(image_list):
@@ -65,44 +59,26 @@ def extract_text_from_pdf(file):
                     base_image = pdf_document.extract_image(xref)
                     image_bytes = base_image["image"]
                     image = Image.open(io.BytesIO(image_bytes))
-                    
-                    
                     ocr_text = pytesseract.image_to_string(image, config='--psm 6')
-                    text += ocr_text
+                    page_text += ocr_text
+            pages.append(page_text)
 
-    return text
+    return pages
 
+# Function to extract a PDF into a Document (one text buffer with page and chunk offsets)
+def extract_document_from_pdf(file):
+    return Document.from_pages(extract_pages_from_pdf(file))
 
-def chunk_text(text, chunk_size=10000, chunk_overlap=1000):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    return text_splitter.split_text(text)
 
+# Function to get a single fused answer with page citations from the PDF content
+def get_gemini_response(question, document, textbook_name):
+    return answer_question(question, document, textbook_name, model.generate)
 
-def get_gemini_response(question, context_chunks, textbook_name):
-    responses = []
-    for chunk in context_chunks:
-        full_prompt = f"Context from {textbook_name}:\n{chunk}\n\nBased on the above context, please answer the following question:\n\n{question}"
-        response = chat.send_message(full_prompt, stream=True)
-        response.resolve()  
-        responses.append(response)
-    
-    combined_response = " ".join(response.text for response in responses)
-    
-    return combined_response.strip()
-
-
-def compare_textbooks(texts, names):
-    if len(texts) == 2:
-        full_prompt = (
-            f"Compare the following two textbooks and determine which one is better based on their content.\n\n"
-            f"Textbook 1 ({names[0]}):\n{texts[0]}\n\n"
-            f"Textbook 2 ({names[1]}):\n{texts[1]}\n\n"
-            "Provide a detailed analysis including which textbook has better coverage of topics, clarity of explanations, accuracy of information, "
-            "and overall quality of the content. Additionally, consider how well each textbook addresses the subject matter and its usefulness for learning."
-        )
-        response = chat.send_message(full_prompt, stream=True)
-        response.resolve()  # Wait for the response to complete
-        comparisons = response.text
+
+def compare_textbooks(documents, names):
+    if len(documents) == 2:
+        full_prompt = build_quality_comparison_prompt(documents, names)
+        comparisons = model.generate(full_prompt)
     else:
         comparisons = "Error: Need exactly two textbooks for comparison."
     
@@ -114,39 +90,49 @@ st.header("Textbook Comparison Bot")
 
 if 'chat_history' not in st.session_state:
     st.session_state['chat_history'] = []
+if 'textbook_handles' not in st.session_state:
+    st.session_state['textbook_handles'] = []
 
 uploaded_files = st.file_uploader("Upload PDFs", type="pdf", accept_multiple_files=True)
 
 if uploaded_files:
-    pdf_texts = []
-    pdf_names = []
+    pdf_handles = []
 
     for uploaded_file in uploaded_files:
         logger.info(f"Processing file: {uploaded_file.name}")
         try:
             uploaded_file.seek(0)  # Reset file stream position
-            pdf_text = extract_text_from_pdf(uploaded_file)
+            pdf_handle = document_store.attach(
+                uploaded_file.getvalue(),
+                uploaded_file.name,
+                lambda: extract_document_from_pdf(uploaded_file),
+            )
             
-            if pdf_text.strip():  # Check if text extraction was successful
-                pdf_texts.append(pdf_text)
-                pdf_names.append(uploaded_file.name)
+            if pdf_handle.document.text.strip():  # Check if text extraction was successful
+                pdf_handles.append(pdf_handle)
             else:
+                pdf_handle.release()
                 st.write(f"Text extraction failed for {uploaded_file.name}.")
                 logger.warning(f"Text extraction failed for {uploaded_file.name}.")
         except Exception as e:
             st.write(f"Error processing {uploaded_file.name}: {e}")
             logger.error(f"Error processing {uploaded_file.name}: {e}")
     
-    st.write("PDF Texts:", pdf_texts)
+    # Keep this run's books attached to the session and let go of the previous run's
+    for handle in st.session_state['textbook_handles']:
+        handle.release()
+    st.session_state['textbook_handles'] = pdf_handles
+    pdf_documents = [handle.document for handle in pdf_handles]
+    pdf_names = [handle.name for handle in pdf_handles]
+
+    st.write("PDF Texts:", [document.text for document in pdf_documents])
     st.write("PDF Names:", pdf_names)
     
     try:
-        if len(pdf_texts) == 2:  # Ensure exactly two PDFs are uploaded
-            # Chunk each textbook's text separately
-            textbook_chunks = [chunk_text(text) for text in pdf_texts]
+        if len(pdf_documents) == 2:  # Ensure exactly two PDFs are uploaded
             textbook_names = pdf_names
 
-            comparisons = compare_textbooks(pdf_texts, textbook_names)
+            comparisons = compare_textbooks(pdf_documents, textbook_names)
             st.subheader("Comparison Result:")
             st.write(comparisons)
 
@@ -157,10 +143,10 @@ if uploaded_files:
             if submit and input_text:
                 # Find the index of the selected textbook
                 selected_index = textbook_names.index(selected_textbook)
-                selected_chunks = textbook_chunks[selected_index]
+                selected_document = pdf_documents[selected_index]
 
-                if selected_chunks:
-                    response = get_gemini_response(input_text, selected_chunks, selected_textbook)
+                if selected_document.chunks:
+                    response = get_gemini_response(input_text, selected_document, selected_textbook)
                     st.session_state['chat_history'].append(("You", input_text))
                     st.subheader("The Response is")
                     st.write(response)
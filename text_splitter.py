@@ -0,0 +1,119 @@
+import logging
+from collections import deque
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+
+
+# Native replacement for langchain's RecursiveCharacterTextSplitter.
+# Produces the same chunk boundaries as langchain (keep_separator=True,
+# literal separators, len as the length function) but works on (start, end)
+# offsets into the original text, so pieces are only sliced out once at the end.
+class RecursiveTextSplitter:
+    def __init__(self, chunk_size=4000, chunk_overlap=200, separators=None):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
+                f"({chunk_size}), should be smaller."
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators or DEFAULT_SEPARATORS)
+
+    # Return the chunks of `text` as strings
+    def split_text(self, text):
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    # Return the chunks of `text` as (start, end) offsets
+    def split_spans(self, text):
+        spans = []
+        self._split(text, 0, len(text), self.separators, spans)
+        return spans
+
+    def _split(self, text, start, end, separators, spans):
+        # Pick the first separator that occurs in this piece of text
+        separator = separators[-1]
+        new_separators = ()
+        for i, sep in enumerate(separators):
+            if sep == "":
+                separator = sep
+                break
+            if text.find(sep, start, end) != -1:
+                separator = sep
+                new_separators = separators[i + 1:]
+                break
+
+        good_splits = []
+        for split_start, split_end in self._split_on_separator(text, start, end, separator):
+            if split_end - split_start < self.chunk_size:
+                good_splits.append((split_start, split_end))
+                continue
+            if good_splits:
+                self._merge_splits(text, good_splits, spans)
+                good_splits = []
+            if not new_separators:
+                spans.append((split_start, split_end))
+            else:
+                self._split(text, split_start, split_end, new_separators, spans)
+        if good_splits:
+            self._merge_splits(text, good_splits, spans)
+
+    # Split text[start:end] before every occurrence of `separator`, keeping the
+    # separator at the head of the following piece. Empty pieces are dropped.
+    @staticmethod
+    def _split_on_separator(text, start, end, separator):
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+        splits = []
+        piece_start = start
+        step = len(separator)
+        match = text.find(separator, start, end)
+        while match != -1:
+            if match > piece_start:
+                splits.append((piece_start, match))
+            piece_start = match
+            match = text.find(separator, match + step, end)
+        if end > piece_start:
+            splits.append((piece_start, end))
+        return splits
+
+    # Combine contiguous small splits into chunks of at most chunk_size,
+    # carrying up to chunk_overlap characters into the next chunk
+    def _merge_splits(self, text, splits, spans):
+        current = deque()
+        total = 0
+        for split_start, split_end in splits:
+            length = split_end - split_start
+            if total + length > self.chunk_size:
+                if total > self.chunk_size:
+                    logger.warning(
+                        f"Created a chunk of size {total}, "
+                        f"which is longer than the specified {self.chunk_size}"
+                    )
+                if current:
+                    self._append_stripped(text, current[0][0], current[-1][1], spans)
+                    while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                        first_start, first_end = current.popleft()
+                        total -= first_end - first_start
+            current.append((split_start, split_end))
+            total += length
+        if current:
+            self._append_stripped(text, current[0][0], current[-1][1], spans)
+
+    # Same as str.strip() on text[start:end], but adjusts offsets instead of copying
+    @staticmethod
+    def _append_stripped(text, start, end, spans):
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            spans.append((start, end))
+
+
+# Splitters are stateless, so reuse one per configuration
+@lru_cache(maxsize=None)
+def get_text_splitter(chunk_size=10000, chunk_overlap=1000):
+    return RecursiveTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)